@@ -6,31 +6,660 @@ what are the total units sold by product in the sample CSV?
 /read_csv file_path="/path/to/your/data.csv"
 /aggregate_csv file_path="sample.csv" group_by="Category" agg_column="Sales_Amount" agg_function="sum"
 /aggregate_csv file_path="sample.csv" group_by="Region,Customer_Type" agg_column="Units_Sold" agg_function="mean"
+/aggregate_csv_files path_pattern="exports/*.csv" group_by="Category" agg_column="Sales_Amount" agg_function="sum"
+/read_csv file_path="exports/2024-01-15.csv.gz" preview_only=true
+/profile_csv file_path="sample.csv"
+/query_csv sql="SELECT Region, SUM(Sales_Amount) AS total FROM 'sample.csv' WHERE Customer_Type = 'Business' GROUP BY Region ORDER BY total DESC"
 """
 
-# For reading and analyzing CSV files
-import pandas as pd
+# For reporting how long the server takes to start
+import sys
+import time
+_START_TIME = time.perf_counter()
+
+# pandas and numpy (for reading and analyzing CSV files) are imported inside the
+# functions that use them, so the server starts fast and the client sees the tools
+# list without waiting for these large libraries to load.
+
 # For file path handling
 from pathlib import Path
+# For limiting how many tool calls run at the same time
+import asyncio
+# For checking the shared server's access token
+import secrets
+# For saving column profiles between server restarts
+import json
+import os
+# For reading only the newly appended part of a growing CSV file
+import hashlib
+import io
+# For finding many CSV files with a wildcard pattern (e.g. exports/*.csv)
+import glob
+# For running CPU-heavy work in worker processes (or threads) next to the server
+import multiprocessing
+import queue
+from concurrent.futures import ThreadPoolExecutor
 # FastMCP for simplified MCP server creation
-from fastmcp import FastMCP
+from fastmcp import FastMCP, Context
+from fastmcp.server.dependencies import get_http_headers
+from fastmcp.server.middleware import Middleware
 
 # Create a new FastMCP server instance
 mcp = FastMCP("csv-reader-server-enhanced")
 
-@mcp.tool()
-def read_csv(file_path: str) -> str:
+# Transport: "stdio" (default, each client starts its own server) or
+# "http" (one long-running server shared by many clients at http://MCP_HOST:MCP_PORT/mcp).
+# A shared server keeps its caches (partial aggregates, profiles) warm for everyone.
+MCP_TRANSPORT = os.environ.get("MCP_TRANSPORT", "stdio")
+MCP_HOST = os.environ.get("MCP_HOST", "127.0.0.1")
+MCP_PORT = int(os.environ.get("MCP_PORT", "8000"))
+# Required in http mode: every client must send "Authorization: Bearer <MCP_AUTH_TOKEN>",
+# because the tools can read any file the server's user can read
+MCP_AUTH_TOKEN = os.environ.get("MCP_AUTH_TOKEN", "")
+
+# Maximum number of tool calls that run at the same time; others wait their turn
+MAX_CONCURRENT_TOOLS = int(os.environ.get("MCP_MAX_CONCURRENT_TOOLS", "4"))
+
+# Reading and aggregating runs outside the server's event loop, so one big file doesn't
+# block other requests. CSV_WORKER_MODE is "process" (default: a pool of worker processes
+# that are reused between calls; a cancelled or timed-out call stops its worker, which is
+# then replaced) or "thread" (lighter, but a cancelled call keeps running in the
+# background until it finishes). CSV_WORKERS is the size of the pool.
+CSV_WORKER_MODE = os.environ.get("CSV_WORKER_MODE", "process")
+CSV_WORKERS = int(os.environ.get("CSV_WORKERS", os.cpu_count() or 1))
+# Seconds a tool call may run (not counting time waiting for a free worker)
+CSV_TOOL_TIMEOUT = float(os.environ.get("CSV_TOOL_TIMEOUT", "300"))
+# Workers are started by a clean "forkserver" process (or with "spawn" where that isn't
+# available), because forking the multithreaded server itself can deadlock the new process
+_process_context = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+if _process_context.get_start_method() == "forkserver":
+    # The fork server loads the large libraries once, so new and replacement workers start quickly
+    _process_context.set_forkserver_preload(["__main__", "fastmcp.server.server", "pandas"])
+_worker_slots = None
+_idle_workers = []
+_thread_pool = None
+
+# Valid aggregation functions for the aggregation tools
+VALID_FUNCTIONS = ['sum', 'mean', 'count', 'min', 'max', 'std']
+
+# Compressed file types that can be read directly (decompressed while reading)
+# Note: .zst files need the optional 'zstandard' package
+COMPRESSION_TYPES = {'.gz': 'gzip', '.zst': 'zstd', '.bz2': 'bz2', '.xz': 'xz'}
+
+# Cache of partial (per-file) aggregation results.
+# Key: (file path, group columns, agg column) -> scan state (see _partial_aggregate)
+# Files that haven't changed since the last call are not read again, and for files
+# that only grew (new rows appended at the end) only the new rows are read.
+# When the partial results take more than MAX_PARTIAL_CACHE_MB of memory, the least
+# recently used entries are dropped (never the ones the current call needs).
+MAX_PARTIAL_CACHE_MB = float(os.environ.get("CSV_MAX_PARTIAL_CACHE_MB", "256"))
+_partial_cache = {}
+
+# Number of bytes at the start and end of the already-read part of a file that are
+# hashed to check that a grown file was appended to, not rewritten
+IDENTITY_BYTES = 4096
+
+
+# Column profiles (from profile_csv), saved to disk so they survive restarts.
+# Key: file path -> profile dict, which stores the file mtime and size it was built from.
+PROFILE_CACHE_FILE = Path(os.environ.get("CSV_PROFILE_CACHE", Path.home() / ".csv_server_profiles.json"))
+_profile_cache = None
+
+# Number of rows read at a time when profiling, and number of top values kept per column
+PROFILE_CHUNK_ROWS = 100_000
+PROFILE_TOP_K = 5
+
+
+class _ConcurrencyLimit(Middleware):
     """
-    Reads a CSV file and returns its contents and basic info.
-    
-    Use when: analyzing data files, checking CSV structure, or viewing data samples.
-    Examples: 'read sales.csv', 'analyze the data file', 'show me what's in the CSV'
-    
-    Args:
-        file_path: Path to the CSV file to read. Can be absolute or relative.
-    
-    Returns:
-        String containing file info and preview of the data.
+    Limits how many tool calls run at the same time, so many clients can't overload the server.
+    """
+
+    def __init__(self, limit):
+        self.semaphore = asyncio.Semaphore(limit)
+
+    async def on_call_tool(self, context, call_next):
+        async with self.semaphore:
+            return await call_next(context)
+
+
+class _RequireToken(Middleware):
+    """
+    Rejects requests to the shared (http) server that don't carry MCP_AUTH_TOKEN.
+    """
+
+    async def on_request(self, context, call_next):
+        auth = get_http_headers(include_all=True).get("authorization", "")
+        token = auth[7:] if auth.lower().startswith("bearer ") else ""
+        if not secrets.compare_digest(token.encode(), MCP_AUTH_TOKEN.encode()):
+            raise PermissionError("Missing or wrong 'Authorization: Bearer <token>' header")
+        return await call_next(context)
+
+
+mcp.add_middleware(_ConcurrencyLimit(MAX_CONCURRENT_TOOLS))
+if MCP_TRANSPORT == "http":
+    mcp.add_middleware(_RequireToken())
+
+
+def _worker_main(messages, fn, args, with_progress):
+    """
+    Runs inside the worker: calls fn and sends progress updates and the result back.
+    """
+    try:
+        if with_progress:
+            result = fn(*args, progress=lambda done, total=None: messages.put(('progress', done, total)))
+        else:
+            result = fn(*args)
+        messages.put(('result', result))
+    except Exception as e:
+        messages.put(('error', str(e)))
+
+
+def _worker_loop(tasks, messages):
+    """
+    Runs inside a pooled worker process: handles one call at a time until stopped.
+    """
+    # Load pandas once, up front, so calls don't pay for it
+    try:
+        import pandas
+    except ImportError:
+        pass
+    while True:
+        fn, args, with_progress = tasks.get()
+        _worker_main(messages, fn, args, with_progress)
+
+
+class _WorkerProcess:
+    """
+    A worker process from the pool, with its own queues for calls and replies.
+    """
+
+    def __init__(self):
+        self.tasks = _process_context.Queue()
+        self.messages = _process_context.Queue()
+        # daemon: the worker is stopped automatically when the server exits
+        self.process = _process_context.Process(target=_worker_loop, args=(self.tasks, self.messages), daemon=True)
+        self.process.start()
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join()
+
+
+async def _run_in_worker(fn, *args, on_progress=None, timeout=CSV_TOOL_TIMEOUT):
+    """
+    Runs fn(*args) in a worker process (or thread) and waits for the result without
+    blocking the server.
+
+    If on_progress is given, fn is called with a progress(done, total) callback and each
+    update is passed on to on_progress. When the call is cancelled by the client or takes
+    longer than timeout seconds, its worker process is stopped and replaced.
+    """
+    global _worker_slots, _thread_pool
+    if _worker_slots is None:
+        _worker_slots = asyncio.Semaphore(CSV_WORKERS)
+    loop = asyncio.get_running_loop()
+
+    async with _worker_slots:
+        with_progress = on_progress is not None
+        if CSV_WORKER_MODE == "thread":
+            if _thread_pool is None:
+                _thread_pool = ThreadPoolExecutor(CSV_WORKERS)
+            messages = queue.SimpleQueue()
+            worker = _thread_pool.submit(_worker_main, messages, fn, args, with_progress)
+            is_running = lambda: not worker.done()
+        else:
+            # Reuse an idle worker from the pool, or start one if the pool isn't full yet
+            worker = _idle_workers.pop() if _idle_workers else _WorkerProcess()
+            worker.tasks.put((fn, args, with_progress))
+            messages = worker.messages
+            is_running = worker.process.is_alive
+
+        # The timeout starts now, not while waiting for a free worker
+        deadline = loop.time() + timeout
+        finished_cleanly = False
+        try:
+            while True:
+                alive = is_running()
+                try:
+                    kind, *payload = messages.get_nowait()
+                except queue.Empty:
+                    if not alive:
+                        raise RuntimeError("The worker stopped without returning a result")
+                    if loop.time() > deadline:
+                        raise TimeoutError(f"Stopped after {timeout:g} seconds (CSV_TOOL_TIMEOUT)")
+                    await asyncio.sleep(0.01)
+                    continue
+
+                if kind == 'progress':
+                    await on_progress(*payload)
+                    continue
+                finished_cleanly = True
+                if kind == 'result':
+                    return payload[0]
+                raise RuntimeError(payload[0])
+        finally:
+            # Runs on success, error, timeout and client cancellation
+            if CSV_WORKER_MODE == "thread":
+                # A thread can't be stopped; this only helps if it hasn't started yet
+                worker.cancel()
+            elif finished_cleanly:
+                _idle_workers.append(worker)
+            else:
+                # Stop the worker (it may still be busy with this call) and start a fresh one
+                worker.stop()
+                _idle_workers.append(_WorkerProcess())
+
+
+def _load_csv(file_path, nrows=None, chunksize=None, dtype=None):
+    """
+    Reads a CSV file, which may be compressed (.gz, .zst, .bz2, .xz).
+
+    Compressed files are decompressed as a stream while parsing, so with nrows
+    only the start of the file is decompressed. Plain files are memory-mapped.
+    With chunksize, returns an iterator of dataframes instead of one dataframe.
+    dtype is passed on to pandas, e.g. to read some columns as text.
+    """
+    import pandas as pd
+
+    compression = COMPRESSION_TYPES.get(Path(file_path).suffix.lower())
+    if compression:
+        return pd.read_csv(file_path, compression=compression, nrows=nrows, chunksize=chunksize, dtype=dtype)
+    return pd.read_csv(file_path, memory_map=True, nrows=nrows, chunksize=chunksize, dtype=dtype)
+
+
+class _HyperLogLog:
+    """
+    Estimates the number of distinct values using a fixed, small amount of memory.
+
+    Each value is hashed; the hash picks one of 2^precision registers, which keeps the
+    longest run of leading zero bits seen. The registers are combined into an estimate
+    (about 1.6% error with the default precision).
+    """
+
+    def __init__(self, precision=12):
+        import numpy as np
+
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    def add(self, series):
+        import numpy as np
+        import pandas as pd
+
+        hashes = pd.util.hash_pandas_object(series, index=False).to_numpy(dtype=np.uint64)
+        remaining_bits = 64 - self.precision
+        index = (hashes >> np.uint64(remaining_bits)).astype(np.int64)
+        rest = hashes & np.uint64((1 << remaining_bits) - 1)
+        # Position of the first 1-bit in the remaining bits (1 = leading bit set)
+        bit_length = np.zeros(len(rest), dtype=np.int64)
+        nonzero = rest > 0
+        bit_length[nonzero] = np.floor(np.log2(rest[nonzero].astype(np.float64))).astype(np.int64) + 1
+        rank = (remaining_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self):
+        import numpy as np
+
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(2.0 ** -self.registers.astype(np.float64))
+        empty = np.count_nonzero(self.registers == 0)
+        if raw <= 2.5 * m and empty:
+            # Small counts: linear counting is more accurate
+            return int(round(m * np.log(m / empty)))
+        return int(round(raw))
+
+
+def _build_profile(file_path, progress=None):
+    """
+    Computes per-column statistics in a single pass over the file, reading it in chunks.
+    If given, progress(rows_read) is called after each chunk.
+    """
+    import pandas as pd
+
+    stat = Path(file_path).stat()
+    rows = 0
+    columns = {}
+    for chunk in _load_csv(file_path, chunksize=PROFILE_CHUNK_ROWS):
+        rows += len(chunk)
+        if progress:
+            progress(rows)
+        for name in chunk.columns:
+            series = chunk[name]
+            col = columns.setdefault(name, {
+                'dtypes': [], 'numeric': True, 'nulls': 0, 'min': None, 'max': None,
+                'hll': _HyperLogLog(), 'counts': {},
+            })
+            if str(series.dtype) not in col['dtypes']:
+                col['dtypes'].append(str(series.dtype))
+            col['numeric'] = col['numeric'] and pd.api.types.is_numeric_dtype(series)
+            col['nulls'] += int(series.isna().sum())
+            values = series.dropna()
+            if values.empty:
+                continue
+            if pd.api.types.is_numeric_dtype(series):
+                low, high = values.min().item(), values.max().item()
+                col['min'] = low if col['min'] is None else min(col['min'], low)
+                col['max'] = high if col['max'] is None else max(col['max'], high)
+            col['hll'].add(values)
+            # Keep a bounded number of candidate values for the top values
+            for value, count in values.astype(str).value_counts().head(PROFILE_TOP_K * 20).items():
+                col['counts'][value] = col['counts'].get(value, 0) + int(count)
+            if len(col['counts']) > PROFILE_TOP_K * 100:
+                col['counts'] = dict(sorted(col['counts'].items(), key=lambda item: -item[1])[:PROFILE_TOP_K * 20])
+
+    profile_columns = {}
+    for name, col in columns.items():
+        # A column whose type changed between chunks (e.g. int64 then float64) is reported
+        # as float64 if all chunks were numbers, otherwise as text
+        if len(col['dtypes']) == 1:
+            dtype = col['dtypes'][0]
+        else:
+            dtype = 'float64' if col['numeric'] else 'object'
+        top = sorted(col['counts'].items(), key=lambda item: -item[1])[:PROFILE_TOP_K]
+        profile_columns[name] = {
+            'dtype': dtype,
+            'numeric': col['numeric'],
+            'nulls': col['nulls'],
+            'min': col['min'],
+            'max': col['max'],
+            'distinct': min(col['hll'].estimate(), rows - col['nulls']),
+            'top_values': top,
+        }
+
+    return {
+        'mtime': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'rows': rows,
+        'columns': profile_columns,
+    }
+
+
+def _load_profile_cache():
+    """
+    Returns the profile cache, loading it from disk on first use.
+    """
+    global _profile_cache
+    if _profile_cache is None:
+        try:
+            _profile_cache = json.loads(PROFILE_CACHE_FILE.read_text())
+        except (OSError, ValueError):
+            _profile_cache = {}
+    return _profile_cache
+
+
+def _get_profile(file_path):
+    """
+    Returns the saved profile for a file, or None if there is none or the file has changed.
+    """
+    stat = Path(file_path).stat()
+    profile = _load_profile_cache().get(str(Path(file_path).resolve()))
+    if profile and profile['mtime'] == stat.st_mtime_ns and profile['size'] == stat.st_size:
+        return profile
+    return None
+
+
+def _save_profile(file_path, profile):
+    """
+    Stores a profile in the cache and writes the cache to disk.
+    """
+    cache = _load_profile_cache()
+    cache[str(Path(file_path).resolve())] = profile
+    try:
+        PROFILE_CACHE_FILE.write_text(json.dumps(cache))
+    except OSError:
+        # Saving is only an optimization; the profile is still kept in memory
+        pass
+
+
+def _file_identity(file_path, length):
+    """
+    Hashes the first and last bytes of the first `length` bytes of a file.
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(min(length, IDENTITY_BYTES))
+        f.seek(max(0, length - IDENTITY_BYTES))
+        tail = f.read(min(length, IDENTITY_BYTES))
+    return hashlib.sha1(head + tail).hexdigest()
+
+
+def _partial_aggregate(file_path, group_columns, agg_column, start=0, columns=None):
+    """
+    Reads one CSV file and returns its partial aggregate per group, with the scan state.
+
+    The partial result holds the building blocks (row count, non-null count, sum,
+    sum of squared differences from the mean (m2), min, max) so results from many files, or from the old and newly
+    appended rows of one file, can be merged into an exact sum, mean, count, min,
+    max or std afterwards.
+
+    With start > 0, only the bytes after `start` are read (rows appended since the
+    last scan), using the header `columns` from the earlier scan.
+    """
+    import pandas as pd
+
+    stat = os.stat(file_path)
+    plain = Path(file_path).suffix.lower() not in COMPRESSION_TYPES
+    # Group keys are always read as text, so the same key matches across files and
+    # appended rows even if pandas would guess a different type for each part
+    key_types = {col: str for col in group_columns}
+
+    if start:
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            data = f.read(stat.st_size - start)
+        df = pd.read_csv(io.BytesIO(data), header=None, names=columns, dtype=key_types)
+        end = start + len(data)
+    else:
+        df = _load_csv(file_path, dtype=key_types)
+        columns = list(df.columns)
+        # Only plain files that didn't change while being read can be continued later
+        end = stat.st_size if plain and os.stat(file_path).st_size == stat.st_size else None
+
+    if agg_column is None:
+        # Counting rows doesn't need a value column
+        partial = df.groupby(group_columns).size().to_frame('rows').reset_index()
+    else:
+        grouped = df.groupby(group_columns)
+        if pd.api.types.is_numeric_dtype(df[agg_column]):
+            partial = grouped[agg_column].agg(['size', 'count', 'sum', 'min', 'max'])
+            partial['m2'] = (grouped[agg_column].var(ddof=0) * partial['count']).fillna(0)
+        else:
+            # Text columns (like names or dates) only support count, min and max
+            partial = grouped[agg_column].agg(['size', 'min', 'max'])
+        partial = partial.rename(columns={'size': 'rows', 'count': 'n'}).reset_index()
+
+    # A file that doesn't end with a newline might be in the middle of writing a row,
+    # so it can't be continued from this point (the next change does a full rescan)
+    ends_with_newline = False
+    if end:
+        with open(file_path, 'rb') as f:
+            f.seek(end - 1)
+            ends_with_newline = f.read(1) == b'\n'
+
+    return {
+        'partial': partial,
+        'columns': columns,
+        'mtime': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'inode': stat.st_ino,
+        'end': end if ends_with_newline else None,
+        'identity': _file_identity(file_path, end) if ends_with_newline else None,
+    }
+
+
+def _partial_aggregate_files(jobs, group_columns, agg_column, progress=None):
+    """
+    Runs _partial_aggregate for several (file, start, columns) jobs in one worker,
+    reporting progress per file.
+    """
+    scans = []
+    for done, (file, start, columns) in enumerate(jobs, start=1):
+        scans.append(_partial_aggregate(file, group_columns, agg_column, start, columns))
+        if progress:
+            progress(done, len(jobs))
+    return scans
+
+
+def _plan_scan(file_path, state):
+    """
+    Decides how to bring a cached scan state up to date with the file.
+
+    Returns 'cached' (file unchanged), 'append' (rows were only appended after
+    state['end']) or 'full' (new, truncated or rewritten file).
+    """
+    if state is None:
+        return 'full'
+    stat = os.stat(file_path)
+    if stat.st_mtime_ns == state['mtime'] and stat.st_size == state['size']:
+        return 'cached'
+    if (state['end'] and stat.st_ino == state['inode'] and stat.st_size > state['end']
+            and _file_identity(file_path, state['end']) == state['identity']):
+        return 'append'
+    return 'full'
+
+
+def _combine_partials(partials, group_columns):
+    """
+    Combines partial aggregates (from many files or many scans) into one partial per group.
+    """
+    import pandas as pd
+
+    combined = pd.concat(partials, ignore_index=True)
+    rules = {'rows': 'sum', 'n': 'sum', 'sum': 'sum', 'm2': 'sum', 'min': 'min', 'max': 'max'}
+    # Only keep statistics every part has (a column that is text in one file isn't numeric)
+    rules = {col: rule for col, rule in rules.items() if all(col in p.columns for p in partials)}
+    merged = combined.groupby(group_columns).agg(rules)
+
+    if 'm2' in rules:
+        # Parallel variance formula (Chan et al.): besides each part's own m2, add how far
+        # each part's mean is from the combined mean, weighted by its count
+        combined = combined.join((merged['sum'] / merged['n']).rename('_mean'), on=group_columns)
+        spread = (combined['n'] * (combined['sum'] / combined['n'] - combined['_mean']) ** 2).fillna(0)
+        merged['m2'] += spread.groupby([combined[col] for col in group_columns]).sum()
+
+    return merged.reset_index()
+
+
+def _merge_partials(partials, group_columns, agg_function, agg_column):
+    """
+    Merges partial aggregates into one final result per group.
+    """
+    import pandas as pd
+
+    merged = _combine_partials(partials, group_columns)
+
+    if agg_function in ['sum', 'mean', 'std'] and 'sum' not in merged.columns:
+        raise ValueError(f"Column '{agg_column}' is not numeric, so '{agg_function}' can't be applied")
+
+    if agg_function == 'count':
+        result = merged[group_columns + ['rows']].rename(columns={'rows': 'count'})
+    else:
+        if agg_function == 'mean':
+            merged['mean'] = merged['sum'] / merged['n']
+        elif agg_function == 'std':
+            # Sample standard deviation (same as pandas); undefined for fewer than 2 values
+            merged['std'] = (merged['m2'] / (merged['n'] - 1)).where(merged['n'] > 1) ** 0.5
+        result = merged[group_columns + [agg_function]].copy()
+
+    # Group keys were read as text; show number-like keys as numbers, sorted numerically
+    for col in group_columns:
+        try:
+            result[col] = pd.to_numeric(result[col])
+        except (ValueError, TypeError):
+            pass
+    return result.sort_values(group_columns).reset_index(drop=True)
+
+
+async def _aggregate_partials(files, group_columns, agg_column, ctx=None):
+    """
+    Returns the partial aggregate of every file (in order), reading only what changed
+    since the last call, plus a count of files per scan type ('cached', 'append', 'full').
+
+    The files that need reading are split over the workers, and progress is reported
+    to the client each time a file is done.
+    """
+    partials = {}
+    jobs = []
+    keys = set()
+    counts = {'cached': 0, 'append': 0, 'full': 0}
+    for file in files:
+        key = (str(Path(file).resolve()), tuple(group_columns), agg_column)
+        keys.add(key)
+        state = _partial_cache.get(key)
+        plan = _plan_scan(file, state)
+        counts[plan] += 1
+        if plan == 'cached':
+            # Move to the end, so it's the last to be dropped
+            _partial_cache[key] = _partial_cache.pop(key)
+            partials[file] = state['partial']
+        elif plan == 'append':
+            jobs.append((file, key, state, state['end'], state['columns']))
+        else:
+            jobs.append((file, key, None, 0, None))
+
+    files_done = 0
+
+    async def file_done(done, total):
+        nonlocal files_done
+        files_done += 1
+        if ctx:
+            await ctx.report_progress(files_done, len(jobs))
+
+    batches = [jobs[i::CSV_WORKERS] for i in range(min(CSV_WORKERS, len(jobs)))]
+    tasks = [asyncio.ensure_future(_run_in_worker(
+                _partial_aggregate_files, [(file, start, columns) for file, _, _, start, columns in batch],
+                group_columns, agg_column, on_progress=file_done))
+             for batch in batches]
+    try:
+        batch_results = await asyncio.gather(*tasks)
+    finally:
+        # If one batch fails, stop the others too
+        for task in tasks:
+            task.cancel()
+
+    # Put the results back in the same order as jobs
+    scans = [None] * len(jobs)
+    for i, batch_result in enumerate(batch_results):
+        scans[i::CSV_WORKERS] = batch_result
+
+    for (file, key, state, _, _), scan in zip(jobs, scans):
+        if state is not None:
+            # Appended rows: merge the new rows into the earlier result
+            scan['partial'] = _combine_partials([state['partial'], scan['partial']], group_columns)
+        scan['bytes'] = int(scan['partial'].memory_usage(deep=True).sum())
+        _partial_cache.pop(key, None)
+        _partial_cache[key] = scan
+        partials[file] = scan['partial']
+
+    # Drop the least recently used entries until the cache fits in memory again
+    size = sum(entry['bytes'] for entry in _partial_cache.values())
+    for key in list(_partial_cache):
+        if size <= MAX_PARTIAL_CACHE_MB * 1024 * 1024:
+            break
+        if key not in keys:
+            size -= _partial_cache.pop(key)['bytes']
+
+    return [partials[file] for file in files], counts
+
+
+def _find_csv_files(path_pattern):
+    """
+    Returns the sorted list of CSV files matching a directory or glob pattern.
+    """
+    path_obj = Path(path_pattern)
+    if path_obj.is_dir():
+        patterns = ['*.csv'] + [f'*.csv{suffix}' for suffix in COMPRESSION_TYPES]
+        return sorted(str(p) for pattern in patterns for p in path_obj.glob(pattern))
+    return sorted(p for p in glob.glob(path_pattern, recursive=True) if Path(p).is_file())
+
+def _read_csv(file_path, preview_only, profile=None):
+    """
+    Body of the read_csv tool; runs in a worker.
+
+    profile is the file's saved profile (looked up by the server, since a worker
+    doesn't see profiles saved after it started), or None.
     """
     try:
         file_path_obj = Path(file_path)
@@ -38,12 +667,17 @@ def read_csv(file_path: str) -> str:
         if not file_path_obj.exists():
             return f"Error: File not found at {file_path_obj}"
         
-        # Read the CSV file into a dataframe
-        df = pd.read_csv(file_path_obj)
+        # Read the CSV file into a dataframe (only the first rows for a preview)
+        df = _load_csv(file_path_obj, nrows=5 if preview_only or profile else None)
         
         # Build result message with file info
         result = f"Successfully read CSV: {file_path_obj}\n"
-        result += f"Shape: {df.shape[0]} rows × {df.shape[1]} columns\n"
+        if profile:
+            result += f"Shape: {profile['rows']} rows × {df.shape[1]} columns (from saved profile)\n"
+        elif preview_only:
+            result += f"Shape: (row count skipped in preview mode) × {df.shape[1]} columns\n"
+        else:
+            result += f"Shape: {df.shape[0]} rows × {df.shape[1]} columns\n"
         result += f"Columns: {', '.join(df.columns)}\n\n"
         
         # Add first 5 rows as preview
@@ -56,7 +690,30 @@ def read_csv(file_path: str) -> str:
         return f"Error reading CSV: {str(e)}"
 
 @mcp.tool()
-def aggregate_csv(file_path: str, group_by: str, agg_column: str, agg_function: str) -> str:
+async def read_csv(file_path: str, preview_only: bool = False) -> str:
+    """
+    Reads a CSV file and returns its contents and basic info.
+    Compressed files (.csv.gz, .csv.zst, .csv.bz2, .csv.xz) are also supported.
+    
+    Use when: analyzing data files, checking CSV structure, or viewing data samples.
+    Examples: 'read sales.csv', 'analyze the data file', 'show me what's in the CSV'
+    
+    Args:
+        file_path: Path to the CSV file to read. Can be absolute or relative.
+        preview_only: If true, only reads the first rows (fast for very large files) and skips the row count.
+    
+    Returns:
+        String containing file info and preview of the data.
+    """
+    try:
+        # If the file was profiled (and hasn't changed), the row count is already known
+        profile = _get_profile(file_path) if Path(file_path).is_file() else None
+        return await _run_in_worker(_read_csv, file_path, preview_only, profile)
+    except Exception as e:
+        return f"Error reading CSV: {str(e)}"
+
+@mcp.tool()
+async def aggregate_csv(file_path: str, group_by: str, agg_column: str, agg_function: str) -> str:
     """
     Aggregates data in a CSV file by grouping columns and applying aggregation functions.
     
@@ -79,30 +736,35 @@ def aggregate_csv(file_path: str, group_by: str, agg_column: str, agg_function:
         if not file_path_obj.exists():
             return f"Error: File not found at {file_path_obj}"
         
-        # Read the CSV file
-        df = pd.read_csv(file_path_obj)
-        
         # Parse group_by columns (handle comma-separated values)
         group_columns = [col.strip() for col in group_by.split(',')]
     
         # Validate aggregation function
-        valid_functions = ['sum', 'mean', 'count', 'min', 'max', 'std']
-        if agg_function not in valid_functions:
-            return f"Error: Invalid function '{agg_function}'. Valid options: {valid_functions}"
-        
-        # Perform aggregation
-        if agg_function == 'count':
-            # For count, we don't need to specify the column
-            agg_result = df.groupby(group_columns).size().reset_index(name='count')
-            agg_col_name = 'count'
-        else:
-            # Apply the aggregation function
-            agg_result = df.groupby(group_columns)[agg_column].agg(agg_function).reset_index()
-            agg_col_name = agg_column
+        if agg_function not in VALID_FUNCTIONS:
+            return f"Error: Invalid function '{agg_function}'. Valid options: {VALID_FUNCTIONS}"
+        
+        # If the file was profiled, check the columns before reading the whole file
+        profile = _get_profile(file_path_obj)
+        if profile:
+            columns = profile['columns']
+            needed = group_columns + ([agg_column] if agg_function != 'count' else [])
+            missing = [col for col in needed if col not in columns]
+            if missing:
+                return f"Error: Column(s) not found: {missing}. Available columns: {list(columns)}"
+            if agg_function not in ['count', 'min', 'max'] and not columns[agg_column]['numeric']:
+                return f"Error: Column '{agg_column}' is not numeric ({columns[agg_column]['dtype']}), so '{agg_function}' can't be applied"
+        
+        # Aggregate the file; if it only grew since the last call, only the new rows are read
+        value_column = None if agg_function == 'count' else agg_column
+        partials, counts = await _aggregate_partials([file_path], group_columns, value_column)
+        agg_result = _merge_partials(partials, group_columns, agg_function, agg_column)
+        agg_col_name = 'count' if agg_function == 'count' else agg_column
+        agg_result = agg_result.rename(columns={agg_function: agg_col_name})
         
         # Build result message
+        scan = {'cached': 'unchanged since last call', 'append': 'only appended rows read', 'full': 'full file read'}
         result = f"Aggregation Results:\n"
-        result += f"File: {file_path_obj}\n"
+        result += f"File: {file_path_obj} ({next(scan[kind] for kind, n in counts.items() if n)})\n"
         result += f"Grouped by: {', '.join(group_columns)}\n"
         result += f"Aggregation: {agg_function}({agg_column if agg_function != 'count' else 'rows'})\n\n"
         
@@ -110,16 +772,200 @@ def aggregate_csv(file_path: str, group_by: str, agg_column: str, agg_function:
         result += agg_result.to_string(index=False)
         
         # Add summary stats
-        if agg_function != 'count':
-            total = agg_result[agg_col_name].sum() if agg_function in ['sum', 'mean'] else None
-            if total is not None:
-                result += f"\n\nTotal {agg_function}: {total:,.2f}"
+        if agg_function in ['sum', 'mean']:
+            total = agg_result[agg_col_name].sum()
+            result += f"\n\nTotal {agg_function}: {total:,.2f}"
         
         return result
         
     except Exception as e:
         return f"Error aggregating CSV: {str(e)}"
 
+@mcp.tool()
+async def aggregate_csv_files(path_pattern: str, group_by: str, agg_column: str, agg_function: str,
+                              ctx: Context = None) -> str:
+    """
+    Aggregates many CSV files at once (a folder or a wildcard pattern) and combines the results.
+    
+    Use when: the data is split across many files, like daily exports in one folder.
+    Examples: 'total sales by region across all exports', 'average units by category for all files in data/'.
+    
+    Args:
+        path_pattern: A folder (all *.csv files inside) or a glob pattern like 'exports/*.csv' or 'data/**/*.csv'
+        group_by: Column name(s) to group by. Use comma-separated for multiple columns (e.g., 'Category,Region')
+        agg_column: Column name to aggregate
+        agg_function: Aggregation function to apply: sum, mean, count, min, max, std
+    
+    Returns:
+        String containing the combined aggregation results across all files.
+    """
+    try:
+        agg_function = agg_function.lower()
+        group_columns = [col.strip() for col in group_by.split(',')]
+        
+        # Validate aggregation function
+        if agg_function not in VALID_FUNCTIONS:
+            return f"Error: Invalid function '{agg_function}'. Valid options: {VALID_FUNCTIONS}"
+        
+        files = _find_csv_files(path_pattern)
+        if not files:
+            return f"Error: No CSV files found for '{path_pattern}'"
+        
+        # Counting rows doesn't depend on a value column, so share the cache entry
+        value_column = None if agg_function == 'count' else agg_column
+        
+        # Only read files (or the appended part of files) that changed since the last call
+        partials, counts = await _aggregate_partials(files, group_columns, value_column, ctx)
+        
+        # Merge the partial results into the final answer
+        agg_result = _merge_partials(partials, group_columns, agg_function, agg_column)
+        agg_col_name = 'count' if agg_function == 'count' else agg_column
+        agg_result = agg_result.rename(columns={agg_function: agg_col_name})
+        
+        # Build result message
+        result = f"Aggregation Results:\n"
+        result += f"Files: {len(files)} matching '{path_pattern}' ({counts['full']} read, {counts['append']} appended, {counts['cached']} from cache)\n"
+        result += f"Grouped by: {', '.join(group_columns)}\n"
+        result += f"Aggregation: {agg_function}({agg_column if agg_function != 'count' else 'rows'})\n\n"
+        result += agg_result.to_string(index=False)
+        
+        if agg_function in ['sum', 'mean']:
+            total = agg_result[agg_col_name].sum()
+            result += f"\n\nTotal {agg_function}: {total:,.2f}"
+        
+        return result
+        
+    except Exception as e:
+        return f"Error aggregating CSV files: {str(e)}"
+
+@mcp.tool()
+async def profile_csv(file_path: str, ctx: Context = None) -> str:
+    """
+    Profiles a CSV file: the type, missing values, min/max, approximate number of distinct values
+    and most common values for every column.
+    
+    Use when: learning what a file contains before aggregating or querying it.
+    Examples: 'what columns are in sales.csv?', 'describe the data file', 'which columns have missing values?'
+    
+    Args:
+        file_path: Path to the CSV file to profile. Can be absolute or relative.
+    
+    Returns:
+        String containing the row count and one line of statistics per column.
+    """
+    try:
+        file_path_obj = Path(file_path)
+        
+        if not file_path_obj.exists():
+            return f"Error: File not found at {file_path_obj}"
+        
+        # Reuse the saved profile if the file hasn't changed, otherwise build a new one
+        profile = _get_profile(file_path_obj)
+        from_cache = profile is not None
+        if not from_cache:
+            # Report the number of rows read so far to the client while profiling
+            async def rows_read(rows, total=None):
+                if ctx:
+                    await ctx.report_progress(rows, total)
+            
+            profile = await _run_in_worker(_build_profile, file_path_obj, on_progress=rows_read)
+            _save_profile(file_path_obj, profile)
+        
+        # Build result message
+        result = f"Profile of CSV: {file_path_obj}{' (saved profile)' if from_cache else ''}\n"
+        result += f"Shape: {profile['rows']} rows × {len(profile['columns'])} columns\n\n"
+        
+        for name, col in profile['columns'].items():
+            result += f"• {name} ({col['dtype']}): {col['nulls']} missing, ~{col['distinct']} distinct"
+            if col['min'] is not None:
+                result += f", min {col['min']}, max {col['max']}"
+            top = ', '.join(f"{value} ({count})" for value, count in col['top_values'])
+            result += f"\n    Most common: {top}\n"
+        
+        return result
+        
+    except Exception as e:
+        return f"Error profiling CSV: {str(e)}"
+
+def _query_csv(sql, max_rows):
+    """
+    Body of the query_csv tool; runs in a worker.
+    """
+    try:
+        # Imported here so the other tools still work without DuckDB installed
+        try:
+            import duckdb
+        except ImportError:
+            return "Error: query_csv needs the 'duckdb' package. Install it with: pip install duckdb"
+        import pandas as pd
+        
+        # Only allow a single query that reads data. DuckDB parses the text, so
+        # "SELECT 1; COPY ... TO ..." or INSTALL / ATTACH / SET statements are rejected.
+        statements = duckdb.extract_statements(sql)
+        if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+            return "Error: Only a single read-only query (SELECT / WITH / FROM) is allowed"
+        
+        # DuckDB scans the CSV files itself, only reading the columns and rows it needs,
+        # and runs the query on all CPU cores. Extensions are never downloaded or loaded
+        # automatically (e.g. httpfs for a query on an https:// URL).
+        with duckdb.connect(config={"autoinstall_known_extensions": False,
+                                    "autoload_known_extensions": False}) as con:
+            cursor = con.execute(statements[0])
+            columns = [col[0] for col in cursor.description]
+            # Fetch one extra row to know if the result was cut off
+            rows = cursor.fetchmany(max_rows + 1)
+        
+        truncated = len(rows) > max_rows
+        df = pd.DataFrame(rows[:max_rows], columns=columns)
+        
+        # Build result message
+        result = f"Query Results:\n"
+        if truncated:
+            result += f"Showing first {max_rows} rows (more rows available; add a LIMIT or aggregate further)\n\n"
+        else:
+            result += f"{len(df)} rows\n\n"
+        result += df.to_string(index=False)
+        
+        return result
+        
+    except Exception as e:
+        return f"Error querying CSV: {str(e)}"
+
+@mcp.tool()
+async def query_csv(sql: str, max_rows: int = 100) -> str:
+    """
+    Runs a SQL query over one or more CSV files using DuckDB, an in-process SQL engine.
+    
+    Use when: the question needs filtering, several aggregations, sorting or joins at once,
+    or when the files are too big to load fully.
+    Refer to files by their path in quotes, and use wildcards to query many files as one table.
+    Examples:
+        "SELECT Category, SUM(Sales_Amount) AS total FROM 'sample.csv' GROUP BY Category"
+        "SELECT * FROM 'exports/*.csv' WHERE Region = 'Europe' ORDER BY Sales_Amount DESC LIMIT 10"
+        "SELECT s.Product, t.Target FROM 'sales.csv' s JOIN 'targets.csv' t ON s.Product = t.Product"
+    
+    Args:
+        sql: A single read-only SQL query (SELECT / WITH / FROM) that references CSV files by path
+        max_rows: Maximum number of result rows to return (default 100)
+    
+    Returns:
+        String containing the query results.
+    """
+    try:
+        return await _run_in_worker(_query_csv, sql, max_rows)
+    except Exception as e:
+        return f"Error querying CSV: {str(e)}"
+
 # Run the server when script is executed directly
 if __name__ == "__main__":
-    mcp.run()
+    if MCP_TRANSPORT == "http" and not MCP_AUTH_TOKEN:
+        sys.exit("MCP_AUTH_TOKEN must be set in http mode, so only your clients can read files "
+                 "(e.g. MCP_AUTH_TOKEN=$(python -c 'import secrets; print(secrets.token_urlsafe(32))'))")
+    # Report the cold-start time on stderr (stdout is reserved for the MCP protocol)
+    print(f"csv-reader-server-enhanced ready in {(time.perf_counter() - _START_TIME) * 1000:.0f} ms", file=sys.stderr)
+    if MCP_TRANSPORT == "http":
+        # On Ctrl+C / SIGTERM, stop accepting new requests and let running ones finish
+        mcp.run(transport="http", host=MCP_HOST, port=MCP_PORT,
+                uvicorn_config={"timeout_graceful_shutdown": 30})
+    else:
+        mcp.run()
@@ -7,16 +7,30 @@ Example prompts to test this server:
 'How many measures are in the semantic model Y?'
 'What is the DAX for measure Z?'
 'What is the total sales by product category?'
+'Now show just the top 5 of those' (served from the saved result, no new query)
 """
 
 #region Imports
+import time
+_START_TIME = time.perf_counter()
+
+import asyncio
 import json
-import requests
 import os
-import time
+import sys
 import base64
-import keyring
+import hashlib
+import re
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from fastmcp import FastMCP
+from fastmcp.server.dependencies import get_http_headers
+from fastmcp.server.middleware import Middleware
+
+# 'requests', 'pandas' (and 'keyring', if you use it) are imported only when first needed,
+# so the server starts fast and the client sees the tools list sooner.
 #endregion
 
 
@@ -34,24 +48,113 @@ TOKEN = os.environ.get("POWERBI_TOKEN", "")
 
 # Option 2: Keyring (recommended for Claude)
 # You must first run `keyring set powerbi token` in the terminal.
+# import keyring
 # TOKEN = keyring.get_password("powerbi", "token")
+
+# Option 3: Shared server mode (MCP_TRANSPORT=http)
+# Each client must send its own token in an "Authorization: Bearer <token>" header,
+# so every user's requests run with their own permissions. TOKEN is not used for clients.
+
+# Transport: "stdio" (default, each client starts its own server) or
+# "http" (one long-running server shared by many clients at http://MCP_HOST:MCP_PORT/mcp)
+MCP_TRANSPORT = os.environ.get("MCP_TRANSPORT", "stdio")
+MCP_HOST = os.environ.get("MCP_HOST", "127.0.0.1")
+MCP_PORT = int(os.environ.get("MCP_PORT", "8000"))
+
+# Maximum number of tool calls that run at the same time; others wait their turn
+MAX_CONCURRENT_TOOLS = int(os.environ.get("MCP_MAX_CONCURRENT_TOOLS", "8"))
+
+# Shared HTTP session, so connections to the Power BI API are reused between calls
+_session = None
+
+# DAX query results kept in memory (execute_dax_query with keep_result=True),
+# so follow-up questions can be answered without querying Power BI again.
+# Key: handle -> dataframe. The oldest results are dropped after MAX_SAVED_RESULTS.
+MAX_SAVED_RESULTS = 20
+_saved_results = {}
+
+# Valid aggregation functions for aggregate_result (same as the CSV server)
+VALID_FUNCTIONS = ['sum', 'mean', 'count', 'min', 'max', 'std']
+
+# Background prefetch of model definitions (opt-in, set POWERBI_PREFETCH=1).
+# get_model_definition can take tens of seconds, so definitions are fetched in the
+# background when list_datasets is called, and at startup for the datasets in
+# POWERBI_PREFETCH_DATASETS ("workspace_id/dataset_id,...") and recently used ones.
+PREFETCH_ENABLED = os.environ.get("POWERBI_PREFETCH", "") == "1"
+PREFETCH_DATASETS = os.environ.get("POWERBI_PREFETCH_DATASETS", "")
+# Number of definitions fetched at the same time
+PREFETCH_WORKERS = int(os.environ.get("POWERBI_PREFETCH_WORKERS", "2"))
+# Maximum number of datasets prefetched per list_datasets call
+PREFETCH_PER_LIST = int(os.environ.get("POWERBI_PREFETCH_PER_LIST", "3"))
+# Seconds a fetched definition is reused before it is fetched again
+DEFINITION_TTL = int(os.environ.get("POWERBI_DEFINITION_TTL", "3600"))
+# Recently used datasets, saved between restarts
+RECENT_DATASETS_FILE = Path(os.environ.get("POWERBI_RECENT_FILE", Path.home() / ".powerbi_server_recent.json"))
+MAX_RECENT_DATASETS = 10
+
+# Fetched definitions: (workspace_id, dataset_id, token id) -> entry dict
+_definitions = {}
+# Definitions being prefetched: same key -> Future
+_prefetching = {}
+_prefetch_pool = None
+_prefetch_lock = threading.Lock()
+_prefetch_stats = {"requests": 0, "prefetch_hits": 0, "cache_hits": 0, "prefetched": 0, "wasted": 0}
 #endregion
 
 
 #region Helper Functions
+## Limits how many tool calls run at the same time
+class ConcurrencyLimit(Middleware):
+    def __init__(self, limit):
+        self.semaphore = asyncio.Semaphore(limit)
+
+    async def on_call_tool(self, context, call_next):
+        async with self.semaphore:
+            return await call_next(context)
+
+
+mcp.add_middleware(ConcurrencyLimit(MAX_CONCURRENT_TOOLS))
+
+
+## Returns the token for the current request
+## In shared server mode, the client's own Authorization header is required
+def get_token():
+    auth = get_http_headers(include_all=True).get("authorization", "")
+    if auth.lower().startswith("bearer "):
+        return auth[7:]
+    if MCP_TRANSPORT == "http":
+        raise PermissionError("Missing 'Authorization: Bearer <token>' header. "
+                              "In shared server mode every client must send its own Power BI token.")
+    return TOKEN
+
+
+## Returns the shared HTTP session, creating it on first use
+## Cookies are disabled, because the session is shared by all users
+def get_session():
+    global _session
+    if _session is None:
+        import requests
+        from http.cookiejar import DefaultCookiePolicy
+        _session = requests.Session()
+        _session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return _session
+
+
 ## Simple HTTP request helper
 ## Returns JSON response or error dict
 def make_request(url, method="GET", data=None):
-    headers = {
-        "Authorization": f"Bearer {TOKEN}",
-        "Content-Type": "application/json"
-    }
+    session = get_session()
     
     try:
+        headers = {
+            "Authorization": f"Bearer {get_token()}",
+            "Content-Type": "application/json"
+        }
+        
         if method == "GET":
-            response = requests.get(url, headers=headers)
+            response = session.get(url, headers=headers)
         else:
-            response = requests.post(url, headers=headers, json=data)
+            response = session.post(url, headers=headers, json=data)
         
         if response.ok:
             return response.json()
@@ -63,12 +166,13 @@ def make_request(url, method="GET", data=None):
 
 ## Wait for a long-running operation to complete
 ## Polls the operation status until success or failure
-def wait_for_operation(location_url, retry_seconds=30):
-    headers = {"Authorization": f"Bearer {TOKEN}"}
+def wait_for_operation(location_url, retry_seconds=30, token=None):
+    session = get_session()
+    headers = {"Authorization": f"Bearer {token or get_token()}"}
     
     while True:
         time.sleep(retry_seconds)
-        response = requests.get(location_url, headers=headers)
+        response = session.get(location_url, headers=headers)
         
         if response.ok:
             data = response.json()
@@ -76,13 +180,235 @@ def wait_for_operation(location_url, retry_seconds=30):
             
             if status == 'Succeeded':
                 # Get the final result
-                result_response = requests.get(f"{location_url}/result", headers=headers)
+                result_response = session.get(f"{location_url}/result", headers=headers)
                 return result_response.json() if result_response.ok else {"error": "Failed to get result"}
             elif status == 'Failed':
                 return {"error": data.get('error', 'Operation failed')}
             # Keep waiting if still running
         else:
             return {"error": f"Failed to check status: {response.status_code}"}
+
+
+## Turns a DAX result table into a dataframe with readable column names
+## 'Product'[Category] -> Category, [@TotalSales] -> TotalSales
+def table_to_frame(table):
+    import pandas as pd
+
+    df = pd.DataFrame(table.get("rows", []))
+    names = {col: re.sub(r"^.*\[@?(.*)\]$", r"\1", col) for col in df.columns}
+    # Keep the full name if two columns would end up with the same short name
+    short_names = list(names.values())
+    df = df.rename(columns={col: name if short_names.count(name) == 1 else col
+                            for col, name in names.items()})
+    return df
+
+
+## Short hash of a token, so cached data can be tied to a user without keeping the token itself
+def token_hash(token):
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+## Saves a dataframe under a new, hard-to-guess handle and returns the handle
+## The result is tied to the token of the user who ran the query
+def save_result(df):
+    handle = f"r_{secrets.token_hex(4)}"
+    _saved_results[handle] = {"frame": df, "owner": token_hash(get_token())}
+    while len(_saved_results) > MAX_SAVED_RESULTS:
+        _saved_results.pop(next(iter(_saved_results)))
+    return handle
+
+
+## Returns the saved dataframe for a handle, or an error message
+## Other users' results are reported as missing, so handles can't be probed
+def get_saved_result(handle):
+    try:
+        owner = token_hash(get_token())
+    except PermissionError as e:
+        return None, f"Error: {str(e)}"
+    entry = _saved_results.get(handle.strip())
+    if entry is None or entry["owner"] != owner:
+        return None, f"Error: No saved result '{handle}'. Run execute_dax_query with keep_result=true first."
+    return entry["frame"], None
+
+
+## Turns a simple filter like "Year == 2024 and `Sales Region` != 'West'" into a row mask
+## Only column / operator / value conditions joined by "and" are allowed, never arbitrary expressions
+def filter_mask(df, filter):
+    import operator
+    operators = {"==": operator.eq, "=": operator.eq, "!=": operator.ne,
+                 ">=": operator.ge, "<=": operator.le, ">": operator.gt, "<": operator.lt}
+    # One condition (column, operator, quoted or single-word value), then "and" or the end.
+    # Reading the conditions one after another keeps "and" inside quotes part of the value.
+    condition_pattern = re.compile(r"""\s*(`[^`]+`|[^=!<>`'"]+?)\s*(==|!=|>=|<=|=|>|<)\s*"""
+                                   r"""('[^']*'|"[^"]*"|[^\s'"]+)\s*(?:(and)\s|$)""", re.IGNORECASE)
+    mask = None
+    position = 0
+    while position < len(filter):
+        match = condition_pattern.match(filter, position)
+        if not match:
+            raise ValueError(f"Can't read condition '{filter[position:].strip()}'. Use: column operator value "
+                             f"(operators: ==, !=, >, >=, <, <=), joined by 'and'; put quotes around text with spaces")
+        column, op, value, joined = match.groups()
+        column = column.strip("`")
+        if column not in df.columns:
+            raise ValueError(f"Unknown column '{column}'")
+        if value[0] in "'\"":
+            value = value[1:-1]
+        else:
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+        condition_mask = operators[op](df[column], value)
+        mask = condition_mask if mask is None else mask & condition_mask
+        position = match.end()
+        if not joined:
+            break
+    return mask
+
+
+## Fetch and decode the TMDL definition of a semantic model
+## Used by get_model_definition and by the background prefetcher (which passes the token)
+def fetch_model_definition(workspace_id, dataset_id, token=None):
+    try:
+        token = token or get_token()
+    except PermissionError as e:
+        return f"Error: {str(e)}"
+    
+    # Call Fabric API
+    url = f"{FABRIC_API}/workspaces/{workspace_id}/semanticModels/{dataset_id}/getDefinition"
+    response = get_session().post(url, headers={"Authorization": f"Bearer {token}"})
+    
+    # Handle long-running operation
+    if response.status_code == 202:
+        location = response.headers.get('Location')
+        retry_after = int(response.headers.get('Retry-After', 30))
+        result = wait_for_operation(location, retry_after, token)
+    elif response.ok:
+        result = response.json()
+    else:
+        return f"Error: HTTP {response.status_code}"
+    
+    if "error" in result:
+        return f"Error: {result['error']}"
+    
+    # Extract and decode TMDL parts
+    parts = result.get("definition", {}).get("parts", [])
+    if not parts:
+        return "No model definition found"
+    
+    output = f"Dataset Model Definition (TMDL Format)\n{'='*40}\n\n"
+    
+    for part in parts:
+        path = part.get("path", "")
+        payload = part.get("payload", "")
+        
+        # Skip non-TMDL files
+        if not path.endswith('.tmdl'):
+            continue
+            
+        try:
+            # Decode content
+            content = base64.b64decode(payload).decode('utf-8')
+            
+            # Add section header
+            output += f"\n{'─'*40}\n"
+            output += f"File: {path}\n"
+            output += f"{'─'*40}\n"
+            output += content
+            output += "\n"
+            
+        except Exception as e:
+            output += f"\nError decoding {path}: {str(e)}\n"
+    
+    return output
+
+
+## Cache key for a definition; includes a hash of the token so users never share definitions
+def definition_key(workspace_id, dataset_id, token):
+    return (workspace_id, dataset_id, token_hash(token))
+
+
+## Returns the cached definition if it is still fresh, otherwise drops it
+## Call with _prefetch_lock held
+def get_fresh_definition(key):
+    entry = _definitions.get(key)
+    if entry and time.time() - entry["time"] > DEFINITION_TTL:
+        del _definitions[key]
+        if entry["prefetched"] and not entry["used"]:
+            _prefetch_stats["wasted"] += 1
+        return None
+    return entry
+
+
+## Stores a fetched definition; call with _prefetch_lock held
+def store_definition(key, output, prefetched):
+    old = _definitions.get(key)
+    if old and old["prefetched"] and not old["used"]:
+        _prefetch_stats["wasted"] += 1
+    _definitions[key] = {"output": output, "time": time.time(), "prefetched": prefetched, "used": False}
+
+
+## Runs in a background thread: fetches one definition and caches it
+def run_prefetch(workspace_id, dataset_id, token, key):
+    try:
+        output = fetch_model_definition(workspace_id, dataset_id, token)
+    except Exception as e:
+        output = f"Error: {str(e)}"
+    with _prefetch_lock:
+        _prefetching.pop(key, None)
+        if not output.startswith(("Error", "No model definition")):
+            store_definition(key, output, prefetched=True)
+            _prefetch_stats["prefetched"] += 1
+    return output
+
+
+## Starts fetching a definition in the background, unless it's cached or already being fetched
+def prefetch_definition(workspace_id, dataset_id, token):
+    global _prefetch_pool
+    if not PREFETCH_ENABLED or not token:
+        return
+    key = definition_key(workspace_id, dataset_id, token)
+    with _prefetch_lock:
+        if key in _prefetching or get_fresh_definition(key):
+            return
+        if _prefetch_pool is None:
+            # The number of worker threads limits how many fetches run at the same time
+            _prefetch_pool = ThreadPoolExecutor(PREFETCH_WORKERS, thread_name_prefix="prefetch")
+        _prefetching[key] = _prefetch_pool.submit(run_prefetch, workspace_id, dataset_id, token, key)
+
+
+## Returns the recently used datasets as [workspace_id, dataset_id] pairs, newest first
+def load_recent_datasets():
+    try:
+        return json.loads(RECENT_DATASETS_FILE.read_text())
+    except (OSError, ValueError):
+        return []
+
+
+## Moves a dataset to the front of the recently used list and saves it
+## Not used in shared server mode: the list is one file for all users, and startup has no client token
+def remember_recent_dataset(workspace_id, dataset_id):
+    if MCP_TRANSPORT == "http":
+        return
+    recent = [pair for pair in load_recent_datasets() if pair != [workspace_id, dataset_id]]
+    recent.insert(0, [workspace_id, dataset_id])
+    try:
+        RECENT_DATASETS_FILE.write_text(json.dumps(recent[:MAX_RECENT_DATASETS]))
+    except OSError:
+        pass
+
+
+## Prints prefetch metrics on stderr (stdout is reserved for the MCP protocol)
+def log_prefetch_stats():
+    # Prefetch threads may change the cache at the same time, so take a snapshot under the lock
+    with _prefetch_lock:
+        stats = dict(_prefetch_stats)
+        unused = sum(1 for entry in _definitions.values() if entry["prefetched"] and not entry["used"])
+    hit_rate = stats["prefetch_hits"] / stats["requests"] if stats["requests"] else 0
+    print(f"prefetch: {stats['prefetch_hits']}/{stats['requests']} definition requests served by prefetch "
+          f"({hit_rate:.0%}), {stats['cache_hits']} cache hits, {stats['prefetched']} prefetched, "
+          f"{stats['wasted']} wasted, {unused} not used yet", file=sys.stderr)
 #endregion
 
 
@@ -130,6 +456,15 @@ def list_datasets(workspace_id: str) -> str:
     for ds in datasets:
         output += f"• {ds['name']} (ID: {ds['id']})\n"
     
+    # Start fetching the definitions the agent is likely to ask for next:
+    # recently used datasets in this workspace first, then the first ones in the list
+    if PREFETCH_ENABLED:
+        listed = [ds['id'] for ds in datasets]
+        recent = [ds_id for ws_id, ds_id in load_recent_datasets() if ws_id == workspace_id and ds_id in listed]
+        token = get_token()
+        for ds_id in list(dict.fromkeys(recent + listed))[:PREFETCH_PER_LIST]:
+            prefetch_definition(workspace_id, ds_id, token)
+    
     return output
 
 
@@ -140,60 +475,52 @@ def get_model_definition(workspace_id: str, dataset_id: str) -> str:
     Returns full model structure in TMDL format which is necessary to do before evaluating DAX queries.
     Examples: 'show me the data model', 'what tables are in this dataset?', 'get all measures and their DAX'
     """
-    # Call Fabric API
-    url = f"{FABRIC_API}/workspaces/{workspace_id}/semanticModels/{dataset_id}/getDefinition"
-    response = requests.post(url, headers={"Authorization": f"Bearer {TOKEN}"})
+    if not PREFETCH_ENABLED:
+        return fetch_model_definition(workspace_id, dataset_id)
     
-    # Handle long-running operation
-    if response.status_code == 202:
-        location = response.headers.get('Location')
-        retry_after = int(response.headers.get('Retry-After', 30))
-        result = wait_for_operation(location, retry_after)
-    elif response.ok:
-        result = response.json()
-    else:
-        return f"Error: HTTP {response.status_code}"
-    
-    if "error" in result:
-        return f"Error: {result['error']}"
-    
-    # Extract and decode TMDL parts
-    parts = result.get("definition", {}).get("parts", [])
-    if not parts:
-        return "No model definition found"
+    try:
+        token = get_token()
+    except PermissionError as e:
+        return f"Error: {str(e)}"
+    key = definition_key(workspace_id, dataset_id, token)
+    remember_recent_dataset(workspace_id, dataset_id)
     
-    output = f"Dataset Model Definition (TMDL Format)\n{'='*40}\n\n"
+    with _prefetch_lock:
+        _prefetch_stats["requests"] += 1
+        entry = get_fresh_definition(key)
+        future = _prefetching.get(key)
     
-    for part in parts:
-        path = part.get("path", "")
-        payload = part.get("payload", "")
-        
-        # Skip non-TMDL files
-        if not path.endswith('.tmdl'):
-            continue
-            
-        try:
-            # Decode content
-            content = base64.b64decode(payload).decode('utf-8')
-            
-            # Add section header
-            output += f"\n{'─'*40}\n"
-            output += f"File: {path}\n"
-            output += f"{'─'*40}\n"
-            output += content
-            output += "\n"
-            
-        except Exception as e:
-            output += f"\nError decoding {path}: {str(e)}\n"
+    if entry:
+        # Already fetched (in the background or by an earlier call)
+        with _prefetch_lock:
+            _prefetch_stats["prefetch_hits" if entry["prefetched"] and not entry["used"] else "cache_hits"] += 1
+            entry["used"] = True
+        output = entry["output"]
+    elif future:
+        # Being prefetched right now: wait for it instead of starting another fetch
+        output = future.result()
+        with _prefetch_lock:
+            entry = _definitions.get(key)
+            if entry:
+                _prefetch_stats["prefetch_hits"] += 1
+                entry["used"] = True
+    else:
+        output = fetch_model_definition(workspace_id, dataset_id, token)
+        if not output.startswith(("Error", "No model definition")):
+            with _prefetch_lock:
+                store_definition(key, output, prefetched=False)
     
+    log_prefetch_stats()
     return output
 
 
 @mcp.tool()
-def execute_dax_query(workspace_id: str, dataset_id: str, query: str) -> str:
+def execute_dax_query(workspace_id: str, dataset_id: str, query: str, keep_result: bool = False) -> str:
     """
     Execute a DAX query against a Power BI dataset.
     Returns query results as JSON data.
+    Set keep_result=true when follow-up questions are likely (top N, sorting, filtering, grouping):
+    the result is saved under a handle that slice_result and aggregate_result can use without re-querying.
     Examples:
         'tell me the total sales by product category',
         'what is the revenue and profit by year and month?',
@@ -213,13 +540,111 @@ def execute_dax_query(workspace_id: str, dataset_id: str, query: str) -> str:
     # Just return the actual data
     results = result.get("results", [])
     if results and "tables" in results[0]:
-        return json.dumps(results[0]["tables"], indent=2)
+        output = json.dumps(results[0]["tables"], indent=2)
+        if keep_result and results[0]["tables"]:
+            df = table_to_frame(results[0]["tables"][0])
+            handle = save_result(df)
+            output += f"\n\nSaved as '{handle}' ({len(df)} rows, columns: {', '.join(df.columns)})"
+        return output
     else:
         return "No data returned"
+
+
+@mcp.tool()
+def slice_result(handle: str, filter: str = "", sort_by: str = "", descending: bool = False,
+                 columns: str = "", offset: int = 0, limit: int = 20) -> str:
+    """
+    Filter, sort and page a saved DAX query result locally, without querying Power BI again.
+    Use the handle returned by execute_dax_query with keep_result=true.
+    Examples: 'now just the top 5', 'sort that by profit', 'only the rows where Year is 2024', 'show the next page'
+    Args:
+        handle: The saved result handle, e.g. 'r_1a2b3c4d'
+        filter: Optional conditions of the form column operator value, joined by 'and',
+                e.g. "Year == 2024 and Profit > 1000" (use `backticks` for names with spaces, quotes for text values)
+        sort_by: Optional column name(s) to sort by, comma-separated
+        descending: Sort from largest to smallest
+        columns: Optional column name(s) to show, comma-separated (default: all)
+        offset: Number of rows to skip (for paging)
+        limit: Maximum number of rows to return
+    """
+    frame, error = get_saved_result(handle)
+    if error:
+        return error
+    
+    df = frame
+    try:
+        if filter:
+            df = df[filter_mask(df, filter)]
+        if sort_by:
+            df = df.sort_values([col.strip() for col in sort_by.split(",")], ascending=not descending)
+        if columns:
+            df = df[[col.strip() for col in columns.split(",")]]
+    except Exception as e:
+        return f"Error: {str(e)}. Available columns: {', '.join(frame.columns)}"
+    
+    if len(df) == 0:
+        return f"No rows in '{handle}' match the filter."
+    if offset >= len(df):
+        return f"No rows at offset {offset}: '{handle}' has {len(df)} row(s){' matching the filter' if filter else ''}."
+    
+    page = df.iloc[offset:offset + limit]
+    output = f"Rows {offset + 1}-{offset + len(page)} of {len(df)} from '{handle}':\n\n"
+    output += page.to_string(index=False)
+    return output
+
+
+@mcp.tool()
+def aggregate_result(handle: str, group_by: str, agg_column: str, agg_function: str) -> str:
+    """
+    Group and aggregate a saved DAX query result locally, without querying Power BI again.
+    Use the handle returned by execute_dax_query with keep_result=true.
+    Examples: 'group that by year', 'what is the average profit per region in that result?'
+    Args:
+        handle: The saved result handle, e.g. 'r_1a2b3c4d'
+        group_by: Column name(s) to group by, comma-separated (e.g. 'Year,Region')
+        agg_column: Column name to aggregate
+        agg_function: Aggregation function to apply: sum, mean, count, min, max, std
+    """
+    df, error = get_saved_result(handle)
+    if error:
+        return error
+    
+    agg_function = agg_function.lower()
+    group_columns = [col.strip() for col in group_by.split(",")]
+    if agg_function not in VALID_FUNCTIONS:
+        return f"Error: Invalid function '{agg_function}'. Valid options: {VALID_FUNCTIONS}"
+    
+    try:
+        if agg_function == "count":
+            agg_result = df.groupby(group_columns).size().reset_index(name="count")
+        else:
+            agg_result = df.groupby(group_columns)[agg_column].agg(agg_function).reset_index()
+    except Exception as e:
+        return f"Error: {str(e)}. Available columns: {', '.join(df.columns)}"
+    
+    output = f"Aggregation of '{handle}':\n"
+    output += f"Grouped by: {', '.join(group_columns)}\n"
+    output += f"Aggregation: {agg_function}({agg_column if agg_function != 'count' else 'rows'})\n\n"
+    output += agg_result.to_string(index=False)
+    return output
 #endregion
 
 
 #region Main Entry Point
 if __name__ == "__main__":
-    mcp.run()
+    # Report the cold-start time on stderr (stdout is reserved for the MCP protocol)
+    print(f"powerbi-server ready in {(time.perf_counter() - _START_TIME) * 1000:.0f} ms", file=sys.stderr)
+    if PREFETCH_ENABLED and MCP_TRANSPORT != "http":
+        # Warm up the configured and recently used datasets in the background.
+        # Not in shared server mode: there each client's own token is needed, so
+        # prefetching only starts from a client's list_datasets call.
+        configured = [item.strip().split("/") for item in PREFETCH_DATASETS.split(",") if item.count("/") == 1]
+        for workspace_id, dataset_id in configured + load_recent_datasets():
+            prefetch_definition(workspace_id, dataset_id, TOKEN)
+    if MCP_TRANSPORT == "http":
+        # On Ctrl+C / SIGTERM, stop accepting new requests and let running ones finish
+        mcp.run(transport="http", host=MCP_HOST, port=MCP_PORT,
+                uvicorn_config={"timeout_graceful_shutdown": 30})
+    else:
+        mcp.run()
 #endregion
\ No newline at end of file